@@ -1,5 +1,7 @@
 import argparse
-import dateutil.parser
+import collections
+import operator
+import orjson
 import requests
 import reverse_geocoder as rg
 import sys
@@ -8,29 +10,167 @@ import util
 
 args = None
 
+# The fields of a raw location entry that are stored in the annotated file.
+RawLocation = collections.namedtuple('RawLocation',
+  ['timestamp', 'latitudeE7', 'longitudeE7', 'accuracy'])
+
+# Fetches the "RawLocation" fields from a raw or annotated location entry, as
+# a tuple.
+get_location_fields = operator.itemgetter(*RawLocation._fields)
+
+# The reverse geocode results includes an "admin1" field which identifies
+# the US state.  This dictionary maps this "admin1" field to a 2-letter state
+# code.
+ADMIN_TO_STATE = {
+  'Alabama': 'AL',
+  'Alaska': 'AK',
+  'Arizona': 'AZ',
+  'Arkansas': 'AR',
+  'California': 'CA',
+  'Colorado': 'CO',
+  'Connecticut': 'CT',
+  'Delaware': 'DE',
+  'Washington, D.C.': 'DC',
+  'Florida': 'FL',
+  'Georgia': 'GA',
+  'Hawaii': 'HI',
+  'Idaho': 'ID',
+  'Illinois': 'IL',
+  'Indiana': 'IN',
+  'Iowa': 'IA',
+  'Kansas': 'KS',
+  'Kentucky': 'KY',
+  'Louisiana': 'LA',
+  'Maine': 'ME',
+  'Maryland': 'MD',
+  'Massachusetts': 'MA',
+  'Michigan': 'MI',
+  'Minnesota': 'MN',
+  'Mississippi': 'MS',
+  'Missouri': 'MO',
+  'Montana': 'MT',
+  'Nebraska': 'NE',
+  'Nevada': 'NV',
+  'New Hampshire': 'NH',
+  'New Jersey': 'NJ',
+  'New Mexico': 'NM',
+  'New York': 'NY',
+  'North Carolina': 'NC',
+  'North Dakota': 'ND',
+  'Ohio': 'OH',
+  'Oklahoma': 'OK',
+  'Oregon': 'OR',
+  'Pennsylvania': 'PA',
+  'Rhode Island': 'RI',
+  'South Carolina': 'SC',
+  'South Dakota': 'SD',
+  'Tennessee': 'TN',
+  'Texas': 'TX',
+  'Utah': 'UT',
+  'Vermont': 'VT',
+  'Virginia': 'VA',
+  'Washington': 'WA',
+  'West Virginia': 'WV',
+  'Wisconsin': 'WI',
+  'Wyoming': 'WY'
+}
+
+# The Nominatim service returns a "state" field which identifies the US
+# state or territory.  This dictionary translates that field into a 2-letter
+# state code, except for territories which are translated to "EX".
+TRANSLATE_STATE = {
+  'Alabama': 'AL',
+  'Alaska': 'AK',
+  'Arizona': 'AZ',
+  'Arkansas': 'AR',
+  'California': 'CA',
+  'Colorado': 'CO',
+  'Connecticut': 'CT',
+  'Delaware': 'DE',
+  'District of Columbia': 'DC',
+  'Florida': 'FL',
+  'Georgia': 'GA',
+  'Guam': 'EX',
+  'Hawaii': 'HI',
+  'Idaho': 'ID',
+  'Illinois': 'IL',
+  'Indiana': 'IN',
+  'Iowa': 'IA',
+  'Kansas': 'KS',
+  'Kentucky': 'KY',
+  'Louisiana': 'LA',
+  'Maine': 'ME',
+  'Maryland': 'MD',
+  'Massachusetts': 'MA',
+  'Michigan': 'MI',
+  'Minnesota': 'MN',
+  'Mississippi': 'MS',
+  'Missouri': 'MO',
+  'Montana': 'MT',
+  'Nebraska': 'NE',
+  'Nevada': 'NV',
+  'New Hampshire': 'NH',
+  'New Jersey': 'NJ',
+  'New Mexico': 'NM',
+  'New York': 'NY',
+  'North Carolina': 'NC',
+  'North Dakota': 'ND',
+  'Northern Mariana Islands': 'EX',
+  'Ohio': 'OH',
+  'Oklahoma': 'OK',
+  'Oregon': 'OR',
+  'Pennsylvania': 'PA',
+  'Puerto Rico': 'EX',
+  'Rhode Island': 'RI',
+  'South Carolina': 'SC',
+  'South Dakota': 'SD',
+  'Tennessee': 'TN',
+  'Texas': 'TX',
+  'Utah': 'UT',
+  'Vermont': 'VT',
+  'Virginia': 'VA',
+  'United States Virgin Islands': 'EX',
+  'Washington': 'WA',
+  'West Virginia': 'WV',
+  'Wisconsin': 'WI',
+  'Wyoming': 'WY'
+}
+
+
 def main():
-  # Parse command line arguments and read input files.
+  # Parse command line arguments and read the annotated file.
   parse_args()
-  raw = util.read_json_file(args.raw)
   annotated = util.read_json_file(args.annotated)
 
+  # Check the geocoding service before anything else, so that a conflicting
+  # service on the command line is an error even when there is nothing new to
+  # annotate.
+  geocoder_added = check_geocoder(annotated)
+
   # Convert the raw and annotated location data into a dictionary indexed by
-  # the timestamp.  We no longer need the raw data anymore, so delete it in
-  # hopes of recovering the memory.
-  ts_to_raw, _ = map_by_timestamp(raw['locations'])
-  ts_to_annotated, ts_to_annotated_index = map_by_timestamp(annotated['locations'])
-  del raw
+  # the timestamp.  The raw file can be very large, so its entries are streamed
+  # directly into the dictionary rather than reading the whole file first, and
+  # only the fields we need are kept from each entry.
+  ts_to_raw = map_raw_by_timestamp(util.iter_json_locations(args.raw))
+  ts_to_annotated = map_by_timestamp(annotated['locations'])
 
   # Check to see if the input annotated data is still consistent with the raw
   # timeline data.  If not, either raise an error or remove the inconsistent
-  # entries, depending on the command line arguments.  If inconsistent entries
-  # are removed, the "ts_to_annotated_index" map is no longer accurate, so
-  # delete it.
-  validate(ts_to_annotated, ts_to_raw, ts_to_annotated_index, annotated)
-  del ts_to_annotated_index
+  # entries, depending on the command line arguments.
+  count = len(annotated['locations'])
+  validate(ts_to_annotated, ts_to_raw, annotated)
+
+  # In the common case where there is no new location data, there is nothing
+  # to annotate.  Only rewrite the annotated file if entries were removed or
+  # the geocoding service was just recorded.
+  if ts_to_raw.keys() <= ts_to_annotated.keys():
+    print('INFO: All entries are already annotated.')
+    if len(annotated['locations']) != count or geocoder_added:
+      util.write_json_file(annotated, args.annotated)
+    return
 
   # Remove entries from "ts_to_raw" which are already in the annotated set.
-  trim(ts_to_annotated, ts_to_raw)
+  ts_to_raw = trim(ts_to_annotated, ts_to_raw)
 
   # Reverse geocode all remaining entries from "ts_to_raw" to get the
   # containing US state, and add these to the annotated locations data set.
@@ -63,25 +203,55 @@ def parse_args():
   args = parser.parse_args()
 
 
+def check_geocoder(annotated):
+  """
+  Make sure the command line doesn't request a different geocoding service if
+  the annotated file already exists.  If the annotated file doesn't have a
+  geocoding service yet, set it according to the command line.  Returns True
+  if the geocoding service was added to the annotated data.
+  """
+  if 'geocoder' in annotated:
+    if args.geocoder and annotated['geocoder'] != args.geocoder:
+      print(f'ERROR: Annotated file already uses "{annotated["geocoder"]}", '
+        'cannot specify different geocoding service on command line.')
+      sys.exit(1)
+    return False
+  annotated['geocoder'] = args.geocoder or 'local'
+  return True
+
+
 def map_by_timestamp(locations):
   """
-  Return two dictionaries whose keys are "datetime" objects.  The first
-  dictionary maps each timestamp to the associated location data for that
-  timestamp.  Entries are inserted into the dictionary in the same order as the
-  entries in the location data.  The second dictionary maps each timestamp to
-  the associated index in the location data list.
+  Return a dictionary whose keys are "datetime" objects, mapping each timestamp
+  to the associated location data for that timestamp.  Entries are inserted
+  into the dictionary in the same order as the entries in the location data.
   """
   mapped_locations = {}
-  mapped_index = {}
-  for i in range(len(locations)):
-    entry = locations[i]
-    ts = dateutil.parser.isoparse(entry['timestamp'])
+  for entry in locations:
+    ts = util.parse_timestamp(entry['timestamp'])
     mapped_locations[ts] = entry
-    mapped_index[ts] = i
-  return mapped_locations, mapped_index
+  return mapped_locations
 
 
-def validate(ts_to_annotated, ts_to_raw, ts_to_annotated_index, annotated):
+def map_raw_by_timestamp(locations):
+  """
+  Return a dictionary whose keys are "datetime" objects, mapping each timestamp
+  to a "RawLocation" for the raw location entry at that timestamp.  Only the
+  fields stored in the annotated file are kept, in a named tuple rather than a
+  dictionary.  Raw entries often have many other fields (e.g. activity
+  guesses), so this greatly reduces the memory needed for a large timeline.
+  The "locations" may be any iterable of raw entries, so it can be streamed
+  from a file.
+  """
+  mapped_locations = {}
+  for entry in locations:
+    fields = get_location_fields(entry)
+    ts = util.parse_timestamp(fields[0])
+    mapped_locations[ts] = RawLocation(*fields)
+  return mapped_locations
+
+
+def validate(ts_to_annotated, ts_to_raw, annotated):
   """
   Check the annotated data to make sure it exists in the raw timeline data.
   Print a diagnostic if data is missing or if a timestamp's entry is different.
@@ -93,15 +263,11 @@ def validate(ts_to_annotated, ts_to_raw, ts_to_annotated_index, annotated):
   missing = []
   changed = []
   for ts, annotated_entry in ts_to_annotated.items():
-    if ts not in ts_to_raw:
+    raw_entry = ts_to_raw.get(ts)
+    if raw_entry is None:
       missing.append(ts)
-    else:
-      raw_entry = ts_to_raw[ts]
-      if (annotated_entry['latitudeE7'] != raw_entry['latitudeE7'] or
-          annotated_entry['longitudeE7'] != raw_entry['longitudeE7'] or
-          annotated_entry['accuracy'] != raw_entry['accuracy'] or
-          annotated_entry['timestamp'] != raw_entry['timestamp']):
-        changed.append(ts)
+    elif get_location_fields(annotated_entry) != raw_entry:
+      changed.append(ts)
 
   # Diagnose an error if there are missing / changed entries and the command
   # line arguments don't ask to delete them.
@@ -118,36 +284,38 @@ def validate(ts_to_annotated, ts_to_raw, ts_to_annotated_index, annotated):
     sys.exit(1)
 
   # If there are missing / changed entries at this point, the user has asked
-  # to delete them from the annotated list.  We must delete them in reverse
-  # order of their index in the list since deleting an entry changes the
-  # indices of the subsequent entries.
-  indices = []
+  # to delete them from the annotated list.  Rather than deleting entries one
+  # at a time, which shifts all the subsequent entries each time, rebuild the
+  # list once without them.  The entries in "ts_to_annotated" are the same
+  # objects as the entries in the list, so they are identified by their "id".
+  removed = set()
   if missing:
     print(f'INFO: Removing {len(missing)} annotated entries that are missing '
       'from raw file:')
     for ts in missing:
       print(f'  {ts}')
-      indices.append(ts_to_annotated_index[ts])
-      del ts_to_annotated[ts]
+      removed.add(id(ts_to_annotated.pop(ts)))
   if changed:
     print(f'INFO: Removing {len(changed)} annotated entries that are different '
       'from raw file:')
     for ts in changed:
       print(f'  {ts}')
-      indices.append(ts_to_annotated_index[ts])
-      del ts_to_annotated[ts]
-  for i in sorted(indices, reverse=True):
-    del annotated['locations'][i]
+      removed.add(id(ts_to_annotated.pop(ts)))
+  if removed:
+    annotated['locations'] = [entry for entry in annotated['locations']
+      if id(entry) not in removed]
 
 
 def trim(ts_to_annotated, ts_to_raw):
   """
-  Remove entries from the raw data which already exist in the annotated data,
-  so that the raw data represents only those entries that need to be added to
-  the annotated set.
+  Return a copy of the raw data without the entries which already exist in the
+  annotated data, so that it represents only those entries that need to be
+  added to the annotated set.  Usually most of the raw entries are already
+  annotated, so building a new dictionary is cheaper than deleting entries
+  from the raw one.
   """
-  for ts in ts_to_annotated.keys():
-    del ts_to_raw[ts]
+  return {ts: entry for ts, entry in ts_to_raw.items()
+    if ts not in ts_to_annotated}
 
 
 def annotate(annotated, ts_to_raw):
@@ -156,66 +324,85 @@ def annotate(annotated, ts_to_raw):
   geocoding to determine the US state that contains each coordinate.  Because
   some reverse geocoding services have a daily limit on the number of requests,
   some raw entries might not be added to the annotated set.  If this happens,
-  an info message is printed.
+  an info message is printed.  The geocoding service must already be set in
+  the annotated data (see "check_geocoder").
   """
 
-  # Make sure the command line doesn't request a different geocoding service
-  # if the annotated file already exists.
-  if 'geocoder' in annotated and args.geocoder:
-    if annotated['geocoder'] != args.geocoder:
-      print(f'ERROR: Annotated file already uses "{annotated["geocoder"]}", '
-        'cannot specify different geocoding service on command line.')
-      sys.exit(1)
-
-  # If the annotated file doesn't exist yet, set the geocoding service
-  # according to the command line.
-  if 'geocoder' not in annotated:
-    annotated['geocoder'] = args.geocoder or 'local'
-
   # Get the list of coordinates to reverse geocode.
-  coords = []
-  for entry in ts_to_raw.values():
-    lat = entry['latitudeE7'] / 1E7
-    lon = entry['longitudeE7'] / 1E7
-    coords.append((lat, lon))
-    if args.limit and len(coords) >= args.limit: break
+  coords = [(e.latitudeE7 / 1E7, e.longitudeE7 / 1E7)
+    for e in ts_to_raw.values()]
   if not coords:
     return
 
-  if len(ts_to_raw) > len(coords):
-    print(f'INFO: Annotating {len(coords)} of {len(ts_to_raw)} entries.')
-  else:
-    print(f'INFO: Annotating {len(coords)} entries.')
-
-  states = geocode(coords, annotated['geocoder'])
-  if len(states) < len(ts_to_raw):
-    remaining = len(ts_to_raw) - len(states)
+  # Coordinates that are already in the annotated set were reverse geocoded by
+  # an earlier run with the same geocoding service, so reuse those states
+  # rather than asking the service again.
+  known = {}
+  for entry in annotated['locations']:
+    lat = entry['latitudeE7'] / 1E7
+    lon = entry['longitudeE7'] / 1E7
+    known[(lat, lon)] = entry['state']
+
+  # The geocoding service might not translate all the coordinates (e.g. if the
+  # command line limits the number of requests), so report how many entries
+  # are actually annotated.
+  states = geocode(coords, annotated['geocoder'], known)
+  if len(states) < len(coords):
+    print(f'INFO: Annotating {len(states)} of {len(coords)} entries.')
+    remaining = len(coords) - len(states)
     print(f'INFO: There are still {remaining} entries not annotated yet.')
+  else:
+    print(f'INFO: Annotating {len(states)} entries.')
 
   # Append entries to the "annotated" data, including the reverse geocoded
   # state.
-  for state, (raw_entry) in zip(states, ts_to_raw.values()):
-    entry = {
-      'timestamp': raw_entry['timestamp'],
-      'latitudeE7': raw_entry['latitudeE7'],
-      'longitudeE7': raw_entry['longitudeE7'],
-      'accuracy': raw_entry['accuracy'],
+  annotated['locations'].extend({
+      'timestamp': raw_entry.timestamp,
+      'latitudeE7': raw_entry.latitudeE7,
+      'longitudeE7': raw_entry.longitudeE7,
+      'accuracy': raw_entry.accuracy,
       'state': state
-    }
-    annotated['locations'].append(entry)
+    } for state, raw_entry in zip(states, ts_to_raw.values()))
 
 
-def geocode(coords, geocoder):
+def geocode(coords, geocoder, known):
   """
   Reverse geocode each coordinate to a US state, using the geocoding
   service specified by "geocoder".  Returns a list of strings, where each
   string is a 2-letter US state code (or "EX" if a coordinate is outside of
   the US).  The returned list may have fewer element than "coords" if the
-  geocoding service is unable to translate all the coordinates.
+  geocoding service is unable to translate all the coordinates, or if the
+  command line limits the number of requests.  The "known" dictionary maps
+  coordinates to states that are already known, and the geocoding service is
+  not asked about these.  New results are added to "known".
   """
-  if geocoder == 'local': return geocode_local(coords)
-  if geocoder == 'osm': return geocode_osm(coords)
-  return []
+
+  # Many entries have exactly the same coordinates (e.g. at home or at work),
+  # so only ask the geocoding service about each distinct coordinate once.
+  # Coordinates are not rounded because nearby points can be in different
+  # states.
+  unique = [c for c in dict.fromkeys(coords) if c not in known]
+  if args.limit and len(unique) > args.limit:
+    print(f'INFO: Reverse geocoding {args.limit} of {len(unique)} new '
+      'coordinates.')
+    unique = unique[:args.limit]
+  elif unique:
+    print(f'INFO: Reverse geocoding {len(unique)} new coordinates.')
+
+  if not unique: unique_states = []
+  elif geocoder == 'local': unique_states = geocode_local(unique)
+  elif geocoder == 'osm': unique_states = geocode_osm(unique)
+  else: return []
+  known.update(zip(unique, unique_states))
+
+  # Map the results back to the original list of coordinates.  If the service
+  # didn't translate all the distinct coordinates, stop at the first one that
+  # is missing.
+  states = []
+  for c in coords:
+    if c not in known: break
+    states.append(known[c])
+  return states
 
 
 def geocode_local(coords):
@@ -224,141 +411,24 @@ def geocode_local(coords):
   US state.  Since this package runs locally, there is no limit on the number
   of queries, so it reverse geocodes all coordinates.
   """
-
-  # The reverse geocode results includes an "admin1" field which identifies
-  # the US state.  This dictionary maps this "admin1" field to a 2-letter state
-  # code.
-  admin_to_state = {
-    'Alabama': 'AL',
-    'Alaska': 'AK',
-    'Arizona': 'AZ',
-    'Arkansas': 'AR',
-    'California': 'CA',
-    'Colorado': 'CO',
-    'Connecticut': 'CT',
-    'Delaware': 'DE',
-    'Washington, D.C.': 'DC',
-    'Florida': 'FL',
-    'Georgia': 'GA',
-    'Hawaii': 'HI',
-    'Idaho': 'ID',
-    'Illinois': 'IL',
-    'Indiana': 'IN',
-    'Iowa': 'IA',
-    'Kansas': 'KS',
-    'Kentucky': 'KY',
-    'Louisiana': 'LA',
-    'Maine': 'ME',
-    'Maryland': 'MD',
-    'Massachusetts': 'MA',
-    'Michigan': 'MI',
-    'Minnesota': 'MN',
-    'Mississippi': 'MS',
-    'Missouri': 'MO',
-    'Montana': 'MT',
-    'Nebraska': 'NE',
-    'Nevada': 'NV',
-    'New Hampshire': 'NH',
-    'New Jersey': 'NJ',
-    'New Mexico': 'NM',
-    'New York': 'NY',
-    'North Carolina': 'NC',
-    'North Dakota': 'ND',
-    'Ohio': 'OH',
-    'Oklahoma': 'OK',
-    'Oregon': 'OR',
-    'Pennsylvania': 'PA',
-    'Rhode Island': 'RI',
-    'South Carolina': 'SC',
-    'South Dakota': 'SD',
-    'Tennessee': 'TN',
-    'Texas': 'TX',
-    'Utah': 'UT',
-    'Vermont': 'VT',
-    'Virginia': 'VA',
-    'Washington': 'WA',
-    'West Virginia': 'WV',
-    'Wisconsin': 'WI',
-    'Wyoming': 'WY'
-  }
-
-  states = []
-  results = rg.search(coords, verbose=False)
-  for res in results:
-    cc = res['cc']
-    admin1 = res['admin1']
-    if cc != 'US':
-      states.append('EX')
-    elif admin1 not in admin_to_state:
-      print(f'ERROR: Unexpected "admin1" from reverse geocode "{admin1}".')
+  # Mode 2 shards the K-D tree query across all CPUs.  This is the package's
+  # default, but pass it explicitly since the query is the costly part here.
+  results = rg.search(coords, mode=2, verbose=False)
+  states = [None] * len(results)
+  for i, res in enumerate(results):
+    if res['cc'] != 'US':
+      states[i] = 'EX'
+      continue
+    state = ADMIN_TO_STATE.get(res['admin1'])
+    if not state:
+      print(f'ERROR: Unexpected "admin1" from reverse geocode '
+        f'"{res["admin1"]}".')
       sys.exit(1)
-    else:
-      states.append(admin_to_state[admin1])
+    states[i] = state
   return states
 
 
 def geocode_osm(coords):
-  # The Nominatim service returns a "state" field which identifies the US
-  # state or territory.  This dictionary translates that field into a 2-letter
-  # state code, except for territories which are translated to "EX".
-  translate_state = {
-    'Alabama': 'AL',
-    'Alaska': 'AK',
-    'Arizona': 'AZ',
-    'Arkansas': 'AR',
-    'California': 'CA',
-    'Colorado': 'CO',
-    'Connecticut': 'CT',
-    'Delaware': 'DE',
-    'District of Columbia': 'DC',
-    'Florida': 'FL',
-    'Georgia': 'GA',
-    'Guam': 'EX',
-    'Hawaii': 'HI',
-    'Idaho': 'ID',
-    'Illinois': 'IL',
-    'Indiana': 'IN',
-    'Iowa': 'IA',
-    'Kansas': 'KS',
-    'Kentucky': 'KY',
-    'Louisiana': 'LA',
-    'Maine': 'ME',
-    'Maryland': 'MD',
-    'Massachusetts': 'MA',
-    'Michigan': 'MI',
-    'Minnesota': 'MN',
-    'Mississippi': 'MS',
-    'Missouri': 'MO',
-    'Montana': 'MT',
-    'Nebraska': 'NE',
-    'Nevada': 'NV',
-    'New Hampshire': 'NH',
-    'New Jersey': 'NJ',
-    'New Mexico': 'NM',
-    'New York': 'NY',
-    'North Carolina': 'NC',
-    'North Dakota': 'ND',
-    'Northern Mariana Islands': 'EX',
-    'Ohio': 'OH',
-    'Oklahoma': 'OK',
-    'Oregon': 'OR',
-    'Pennsylvania': 'PA',
-    'Puerto Rico': 'EX',
-    'Rhode Island': 'RI',
-    'South Carolina': 'SC',
-    'South Dakota': 'SD',
-    'Tennessee': 'TN',
-    'Texas': 'TX',
-    'Utah': 'UT',
-    'Vermont': 'VT',
-    'Virginia': 'VA',
-    'United States Virgin Islands': 'EX',
-    'Washington': 'WA',
-    'West Virginia': 'WV',
-    'Wisconsin': 'WI',
-    'Wyoming': 'WY'
-  }
-
   if not args.email:
     print(f'ERROR: Must specify email adress when using "osm" geocoder.')
     sys.exit(1)
@@ -379,16 +449,32 @@ def geocode_osm(coords):
   # error handling is to print the error message and terminate the loop, but
   # return any data that was successfully geocoded.  This allows the
   # successful data to be stored in the annotated file.
+  #
+  # All requests go through one session, so the HTTPS connection to the server
+  # is reused rather than reconnecting for every coordinate.  The usage policy
+  # also asks for a User-Agent that identifies the application.
   states = []
   completed = 0
   total = len(coords)
+  last_request = None
+  session = requests.Session()
+  session.headers['User-Agent'] = 'nydays-geolocation'
   print('INFO: You can interrupt by pressing CTRL-C.')
   try:
     for c in coords:
+      # The terms of use require a 1 second delay between requests.  Only wait
+      # for the part of that second which wasn't already spent handling the
+      # previous request.
+      # https://operations.osmfoundation.org/policies/nominatim/
+      if last_request is not None:
+        delay = last_request + 1 - time.monotonic()
+        if delay > 0: time.sleep(delay)
+      last_request = time.monotonic()
+
       # Add the coordinates to the argument list and send the request.
       req_args['lat'] = c[0]
       req_args['lon'] = c[1]
-      r = requests.get(url, params=req_args)
+      r = session.get(url, params=req_args)
 
       # If we get an error code or the response isn't JSON format,
       # something is wrong.
@@ -397,7 +483,7 @@ def geocode_osm(coords):
         print(f'ERROR: Response error: {r.status_code}.')
         break
       try:
-        rjson = r.json()
+        rjson = orjson.loads(r.content)
       except ValueError:
         if completed: print('')
         print(f'ERROR: Response not JSON.')
@@ -418,30 +504,29 @@ def geocode_osm(coords):
           'state' not in rjson['address']:
         states.append('EX')
       else:
-        # The "translate_state" dictionary contains all the values we expect
+        # The "TRANSLATE_STATE" dictionary contains all the values we expect
         # to see in the "state" field.  If we see any other value, diagnose an
         # error, so the dictionary can be updated.
         rstate = rjson['address']['state']
-        if rstate not in translate_state:
+        state = TRANSLATE_STATE.get(rstate)
+        if not state:
           if completed: print('')
           print(f'ERROR: Unexpected "state" from reverse geocode "{rstate}".')
           break
-        else:
-          states.append(translate_state[rstate])
+        states.append(state)
 
-      # Print progress and wait 1 second.  The terms of use require a 1 second
-      # delay between requests.
-      # https://operations.osmfoundation.org/policies/nominatim/
+      # Print progress.
       completed += 1
       pct = (completed / total) * 100
       print(f'\rINFO: Completed {completed} annotations ({pct:.0f}%).',
         end='', flush=True)
-      time.sleep(1)
     else:
       print('')
   except KeyboardInterrupt:
     if completed: print('')
     print('INFO: Interrupted from keyboard.')
+  finally:
+    session.close()
 
   return states
 
@@ -1,21 +1,20 @@
 import argparse
-import dateutil.parser
+import datetime
 import pathlib
-import pytz
 import sys
 import util
 
 args = None
 
 def main():
-  # Parse command line arguments and read input files.
+  # Parse command line arguments and read the annotated file.
   parse_args()
-  raw = util.read_json_file(args.raw)
   annotated = util.read_json_file(args.annotated)
 
   # Get subsets of the input data containing only the location entries that
-  # are in the requested tax year.
-  raw_archive = get_archived_raw(raw)
+  # are in the requested tax year.  The raw file can be very large, so its
+  # entries are streamed and only those in the archive are kept in memory.
+  raw_archive = get_archived_raw(util.iter_json_locations(args.raw))
   annotated_archive = get_archived_annotated(annotated)
 
   # Write the subsetted data as the archive files.
@@ -56,12 +55,13 @@ def parse_args():
     args.begin = args.year
     args.end = args.year
 
-def get_archived_raw(raw):
+def get_archived_raw(raw_locations):
   """
   Return a subset of the raw data containing only timestamp entries that fall
-  within the requested tax year.
+  within the requested tax year.  The "raw_locations" may be any iterable of
+  raw location entries, so it can be streamed from a file.
   """
-  locations = get_archived_locations(raw['locations'])
+  locations = get_archived_locations(raw_locations)
   return {'locations': locations}
 
 
@@ -82,12 +82,30 @@ def get_archived_locations(locations):
   Return a subset of the locations data containing only timestamp entries that
   fall within the requested tax year.
   """
+
+  # The tax years are in the US/Eastern timezone.  Find the instants when the
+  # first year starts and the last year ends, so each entry just needs to be
+  # compared against them rather than converted to the Eastern timezone.  Also
+  # find the UTC dates of these instants.
+  begin = datetime.datetime(args.begin, 1, 1, tzinfo=util.EASTERN)
+  end = datetime.datetime(args.end + 1, 1, 1, tzinfo=util.EASTERN)
+  begin_day = begin.astimezone(datetime.timezone.utc).date().isoformat()
+  end_day = end.astimezone(datetime.timezone.utc).date().isoformat()
+
   archived = []
-  eastern = pytz.timezone('US/Eastern')
   for entry in locations:
-    ts = dateutil.parser.isoparse(entry['timestamp'])
-    tsEastern = ts.astimezone(eastern)
-    if (tsEastern.year >= args.begin) and (tsEastern.year <= args.end):
+    # A UTC timestamp (with a "Z" suffix) starts with its UTC date.  Comparing
+    # that date as a string decides most entries without parsing them.  Only
+    # entries on the same UTC date as "begin" or "end" need a full comparison.
+    timestamp = entry['timestamp']
+    if timestamp.endswith('Z'):
+      day = timestamp[:10]
+      if day < begin_day or day > end_day:
+        continue
+      if begin_day < day < end_day:
+        archived.append(entry)
+        continue
+    if begin <= util.parse_timestamp(timestamp) < end:
       archived.append(entry)
   return archived
 
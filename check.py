@@ -1,26 +1,27 @@
 import argparse
+import collections
 import datetime
-import dateutil.parser
+import itertools
 import openpyxl
-import pytz
 import sys
 import util
 
 args = None
 
 def main():
-  # Parse command line arguments and read input files.
+  # Parse command line arguments and open the workbook.
   parse_args()
-  annotated = util.read_json_file(args.annotated)
   ws = get_worksheet()
 
   # Create a dictionary from the NY Days spreadsheet, mapping each day to a
   # Boolean telling whether the day is a "NY day".
   ny_days = get_ny_days(ws)
 
-  # Create a dictionary that maps each day to the annotated entries for that
-  # day.
-  mapped = map_days_to_entries(annotated)
+  # Create a dictionary that maps each day in the spreadsheet to the annotated
+  # entries for that day.  The entries are streamed from the annotated file,
+  # so the file is never held in memory as a whole.
+  mapped = map_days_to_entries(util.iter_json_locations(args.annotated),
+    ny_days)
 
   # Check the dictionary against the location data to see if any non-NY day
   # was actually spent in NY.
@@ -82,27 +83,26 @@ def get_ny_days(ws):
     # The row identifies a range of days.  Loop over all these days.
     start = start.date()
     end = end.date()
-    days = (end - start).days + 1
-    for day in [start + datetime.timedelta(days=x) for x in range(days)]:
-      ny_days[day] = (in_ny != None)
+    is_ny_day = (in_ny != None)
+    for x in range((end - start).days + 1):
+      ny_days[start + datetime.timedelta(days=x)] = is_ny_day
   return ny_days
 
 
-def map_days_to_entries(annotated):
+def map_days_to_entries(locations, days):
   """
   Create a dictionary from the annotated timestamp entries.  Each key is a "date" 
-  object representing a day in NY timezone, and each value is a list of the
-  annotated entries for that day.
+  object representing a day in NY timezone, and each value is a list of
+  (accuracy, state) tuples for the annotated entries on that day.  The
+  "locations" may be any iterable of annotated entries, so it can be streamed
+  from a file.  Only entries on the days in "days" are kept, since the others
+  are never checked.
   """
-  mapped = {}
-  eastern = pytz.timezone('US/Eastern')
-  for entry in annotated['locations']:
-    ts = dateutil.parser.isoparse(entry['timestamp'])
-    tsEastern = ts.astimezone(eastern)
-    day = tsEastern.date()
-    if not day in mapped:
-      mapped[day] = []
-    mapped[day].append(entry)
+  mapped = collections.defaultdict(list)
+  for entry in locations:
+    day = util.eastern_date(entry['timestamp'])
+    if day not in days: continue
+    mapped[day].append((entry['accuracy'], entry['state']))
   return mapped
 
 
@@ -115,17 +115,19 @@ def check(ny_days, mapped):
   warn = []
   err = []
   inaccurate_count = 0
+  max_accuracy = args.accuracy
   for day, in_ny in ny_days.items():
     if in_ny: continue
 
-    # Create a list of the accurate timestamp entries for this day.
+    # Create a list of the states of the accurate timestamp entries for this
+    # day.
     accurate = []
     if day in mapped:
-      for entry in mapped[day]:
-        if args.accuracy and entry['accuracy'] > args.accuracy:
+      for accuracy, state in mapped[day]:
+        if max_accuracy and accuracy > max_accuracy:
           inaccurate_count += 1
         else:
-          accurate.append(entry)
+          accurate.append(state)
 
     # A non-NY day with no location data is a warning.
     if not accurate:
@@ -133,10 +135,8 @@ def check(ny_days, mapped):
       continue
 
     # A non-NY day with a location in NY is an error.
-    for entry in accurate:
-      if entry['state'] == 'NY':
-        err.append(day)
-        break
+    if 'NY' in accurate:
+      err.append(day)
 
   if inaccurate_count:
     print(f'INFO: Skipped {inaccurate_count} inaccurate entries.')
@@ -154,20 +154,18 @@ def print_days(prefix, days):
   Print a list of dates, where each range of consecutive dates is on its own
   line.  Each line is prefixed by the string "prefix".
   """
-  i = 0
-  while i < len(days):
-    first_day = days[i]
-    last_day = first_day
-    for j in range(i+1, len(days)):
-      day = days[j]
-      if day != last_day + datetime.timedelta(days=1): break
-      last_day = day
-      i = j
+
+  # Within a range of consecutive days, each day's ordinal minus its position
+  # in the list is the same, so group the days by this difference.
+  for _, group in itertools.groupby(enumerate(days),
+      key=lambda x: x[1].toordinal() - x[0]):
+    group = list(group)
+    first_day = group[0][1]
+    last_day = group[-1][1]
     if (first_day == last_day):
       print(prefix + f'{first_day}')
     else:
       print(prefix + f'{first_day} - {last_day}')
-    i += 1
 
 
 if __name__=="__main__":
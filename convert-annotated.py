@@ -28,7 +28,8 @@
 
 import argparse
 import datetime
-import json
+import orjson
+import util
 
 args = None
 
@@ -37,17 +38,16 @@ def main():
   old_annotated = read_old_annotated_file(args.annotated)
 
   locations = []
-  for day, day_entry in old_annotated['days'].items():
-    for ts, ts_entry in day_entry.items():
-      ts_as_datetime = datetime.datetime.fromtimestamp(ts / 1000, datetime.timezone.utc)
-      ts_as_string = ts_as_datetime.isoformat()
-      if ts_as_string.endswith('000+00:00'):
-        ts_as_string = ts_as_string[0:-9] + 'Z'
-      elif ts_as_string.endswith('+00:00'):
-        ts_as_string = ts_as_string[0:-6] + 'Z'
-      else:
-        print(f'ERROR: Unexpected timestamp format: "{ts_as_string}".')
-      ts_entry['timestamp'] = ts_as_string
+  for day_entry in old_annotated['days'].values():
+    for ts_str, ts_entry in day_entry.items():
+      # The keys are integer milliseconds since the epoch, so format the
+      # seconds and milliseconds directly.
+      seconds, millis = divmod(int(ts_str), 1000)
+      ts_as_datetime = datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc)
+      ts_as_string = ts_as_datetime.strftime('%Y-%m-%dT%H:%M:%S')
+      if millis:
+        ts_as_string += f'.{millis:03d}'
+      ts_entry['timestamp'] = ts_as_string + 'Z'
       locations.append(ts_entry)
 
   new_annotated = {
@@ -55,11 +55,7 @@ def main():
     'locations': locations
   }
 
-  try:
-    with open(args.output, 'w') as f:
-      json.dump(new_annotated, f, sort_keys=True, indent=2)
-  except IOError:
-    print(f'ERROR: Unable to write annotated file "{args.output}".')
+  util.write_json_file(new_annotated, args.output)
 
 
 def parse_args():
@@ -77,22 +73,14 @@ def parse_args():
 def read_old_annotated_file(name):
   """Read the old-format annotated file (if it exists), and return its data."""
   try:
-    with open(name) as f:
-      converted = json.load(f)
+    with open(name, 'rb') as f:
+      converted = orjson.loads(f.read())
   except IOError:
     converted = {'days': {}}
 
-  # The JSON file stores the dictionary keys as strings.  Convert the date
-  # keys into "date" objects and the timestamp keys into "datetime" objects.
-  days = {}
-  for day_conv, day_entry_conv in converted['days'].items():
-    day = datetime.date.fromisoformat(day_conv)
-    day_entry = {}
-    days[day] = day_entry
-    for ts_conv, entry in day_entry_conv.items():
-      ts = int(ts_conv)
-      day_entry[ts] = entry
-  converted['days'] = days
+  # The JSON file stores the dictionary keys as strings.  The date keys are not
+  # needed, and main() converts each timestamp key as it goes, so the data is
+  # returned unchanged.
   return converted
 
 
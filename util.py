@@ -1,12 +1,48 @@
-import json
+import datetime
+import ijson
+import orjson
 import sys
+import zoneinfo
+
+# Days are counted in the timezone of NY state.
+EASTERN = zoneinfo.ZoneInfo('America/New_York')
+
+
+def parse_timestamp(timestamp):
+  """
+  Parse an ISO-8601 timestamp string from a location entry and return a
+  timezone aware "datetime" object.
+  """
+  # Python versions before 3.11 don't accept the "Z" suffix for UTC.
+  return datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def eastern_date(timestamp):
+  """
+  Return a "date" object telling the day in the Eastern timezone of an
+  ISO-8601 timestamp string from a location entry.
+  """
+
+  # The Eastern timezone is always 4 or 5 hours behind UTC.  Therefore, a UTC
+  # timestamp (with a "Z" suffix) from 05:00 onward is on the same day in the
+  # Eastern timezone, and a timestamp before 04:00 is on the previous day.
+  # Only timestamps in the 04:00 hour depend on daylight saving time, so only
+  # these need a full timezone conversion.
+  if timestamp.endswith('Z'):
+    hour = int(timestamp[11:13])
+    if hour >= 5:
+      return datetime.date.fromisoformat(timestamp[:10])
+    if hour < 4:
+      return (datetime.date.fromisoformat(timestamp[:10]) -
+        datetime.timedelta(days=1))
+  return parse_timestamp(timestamp).astimezone(EASTERN).date()
 
 
 def read_json_file(filename):
   """Read a JSON file and return its data.  Exit on error."""
   try:
-    with open(filename) as f:
-      return json.load(f)
+    with open(filename, 'rb') as f:
+      return orjson.loads(f.read())
   except IOError:
     print(f'ERROR: Unable to read file "{filename}".')
     sys.exit(1)
@@ -15,8 +51,38 @@ def read_json_file(filename):
 def write_json_file(data, filename):
   """Write a JSON file.  Exit on error."""
   try:
-    with open(filename, 'w') as f:
-      json.dump(data, f, sort_keys=True, indent=2)
+    with open(filename, 'wb') as f:
+      f.write(orjson.dumps(data,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
   except IOError:
     print(f'ERROR: Unable to write file "{filename}".')
     sys.exit(1)
+
+
+def iter_json_locations(filename):
+  """
+  Iterate over the entries of the "locations" list in a JSON file.  The file is
+  parsed incrementally, so the entire file is never held in memory.  Exit on
+  error, including when the file has no "locations" list.
+  """
+  try:
+    with open(filename, 'rb') as f:
+      found = False
+      for entry in ijson.items(f, 'locations.item', use_float=True):
+        found = True
+        yield entry
+
+      # No entries could mean either an empty "locations" list or a file that
+      # doesn't have one at all (e.g. the wrong file).  Treating the latter as
+      # empty could make the callers discard all their data, so check which it
+      # is.
+      if not found:
+        f.seek(0)
+        found = any(prefix == 'locations' and event == 'start_array'
+          for prefix, event, _ in ijson.parse(f))
+  except IOError:
+    print(f'ERROR: Unable to read file "{filename}".')
+    sys.exit(1)
+  if not found:
+    print(f'ERROR: File "{filename}" does not contain a "locations" list.')
+    sys.exit(1)
@@ -1,21 +1,23 @@
 import argparse
+import collections
+import csv
 import datetime
-import dateutil.parser
-import pytz
 import util
 
 args = None
 
 def main():
-  # Parse command line arguments and open annotated file.
+  # Parse command line arguments.
   parse_args()
-  annotated = util.read_json_file(args.annotated)
 
   # Create a dictionary summarizing the number of timestamp entries in each
   # US state for each day:
   #
   # {day: {state: <count>, ...}, ...}
-  summary = summarize(annotated)
+  #
+  # The entries are streamed from the annotated file, so the file is never
+  # held in memory as a whole.
+  summary = summarize(util.iter_json_locations(args.annotated))
 
   # Get a list of all the states in the summary.  These will be the columns
   # in the spreadsheet.
@@ -41,44 +43,43 @@ def parse_args():
   args = parser.parse_args()
 
 
-def summarize(annotated):
+def summarize(locations):
   """
   Returns a dictionary with one key for each day.  Each value is also a
   dictionary, where each key is a state and the value is the number of
-  timestamp entries in that state for that day.
+  timestamp entries in that state for that day.  The "locations" may be any
+  iterable of annotated entries, so it can be streamed from a file.
   """
-  summary = {}
+  summary = collections.defaultdict(collections.Counter)
   inaccurate_count = 0
-  last_day = None
-  eastern = pytz.timezone('US/Eastern')
-  for entry in annotated['locations']:
+  max_accuracy = args.accuracy
+  for entry in locations:
     # Since NY is in the Eastern timezone, get the day of this entry in that
-    # timezone.
-    ts = dateutil.parser.isoparse(entry['timestamp'])
-    tsEastern = ts.astimezone(eastern)
-    day = tsEastern.date()
-
-    # Create empty entries for any missing days from the annotated data.
-    if last_day and last_day < day:
-      last_day += datetime.timedelta(days=1)
-      while last_day < day:
-        summary[last_day] = {}
-        last_day += datetime.timedelta(days=1)
-
-    if args.accuracy and entry['accuracy'] > args.accuracy:
+    # timezone.  Looking up the day's counts creates an empty entry for the
+    # day even if all its location entries are inaccurate.
+    day = util.eastern_date(entry['timestamp'])
+    day_entry = summary[day]
+
+    if max_accuracy and entry['accuracy'] > max_accuracy:
       inaccurate_count += 1
     else:
-      if day not in summary:
-        summary[day] = {}
-      state = entry['state']
-      if not state in summary[day]:
-        summary[day][state] = 0
-      summary[day][state] += 1
-    last_day = day
+      day_entry[entry['state']] += 1
 
   if inaccurate_count:
     print(f'INFO: Skipped {inaccurate_count} inaccurate entries.')
-  return summary
+  if not summary:
+    return {}
+
+  # Create empty entries for any missing days from the annotated data, and
+  # order the days by date.
+  ordered = {}
+  day = min(summary)
+  last_day = max(summary)
+  one_day = datetime.timedelta(days=1)
+  while day <= last_day:
+    ordered[day] = summary[day]
+    day += one_day
+  return ordered
 
 
 def find_states(summary):
@@ -86,13 +87,10 @@ def find_states(summary):
   Return a list of all the states that are in the summary dictionary, sorted
   by the order in which we want them to appear in the spreadsheet.
   """
-  found_ex = False
-  states_dict = {}
-  for day_entry in summary.values():
-    for state in day_entry.keys():
-      if state == 'EX': found_ex = True
-      else: states_dict[state] = True
-  states = sorted(states_dict.keys())
+  all_states = set().union(*summary.values())
+  found_ex = 'EX' in all_states
+  all_states.discard('EX')
+  states = sorted(all_states)
   if found_ex: states.append('EX')
   return states
 
@@ -107,12 +105,16 @@ def make_spreadsheet(states, summary):
   cells.append(row)
 
   # The remaining rows are the data for each date.  For cells that have a
-  # zero count, leave the cell blank rather than setting it to "0".
+  # zero count, leave the cell blank rather than setting it to "0".  Each
+  # state's column is looked up once, so only the states present on a day
+  # are visited.
+  columns = {state: i for i, state in enumerate(states, 1)}
+  blank_row = [''] * len(columns)
   for day, day_entry in summary.items():
-    row = []
-    row.append(day.isoformat())
-    for state in states:
-      row.append(str(day_entry.get(state, '')))
+    row = [day.isoformat()]
+    row.extend(blank_row)
+    for state, count in day_entry.items():
+      row[columns[state]] = str(count)
     cells.append(row)
   return cells
 
@@ -120,10 +122,8 @@ def make_spreadsheet(states, summary):
 def write_csv(name, cells):
   """Write the spreadsheet cells as a CSV text file."""
   try:
-    with open(name, 'w') as f:
-      for row in cells:
-        line = ','.join(row)
-        f.write(line + '\n')
+    with open(name, 'w', newline='') as f:
+      csv.writer(f, lineterminator='\n').writerows(cells)
   except IOError:
     print(f'ERROR: Unable to write CSV file "{name}".')
 